@@ -0,0 +1,44 @@
+import re
+
+
+# Keyword groups used to find gender, staffing, enrolment, location and
+# facility columns by name in the UDISE tables. Keywords are regex fragments
+# matched case-insensitively; 'male' must not match inside 'female'
+COLUMN_GROUPS = {
+    'gender': ('girl', 'female', 'boy', '(?<!fe)male'),
+    'girl': ('girl', 'female'),
+    'boy': ('boy', '(?<!fe)male'),
+    'teacher': ('teacher',),
+    'student': ('student', 'enrolment', 'enrolled'),
+    'rural': ('rural',),
+    'urban': ('urban',),
+    'facility': ('toilet', 'water', 'library', 'computer', 'internet', 'electricity'),
+    # The facility coverage chart has always left electricity out
+    'plotted_facility': ('toilet', 'water', 'library', 'computer', 'internet'),
+}
+
+_GROUP_PATTERNS = {group: re.compile('|'.join(keywords), re.IGNORECASE)
+                   for group, keywords in COLUMN_GROUPS.items()}
+
+_ANY_KEYWORD = re.compile('|'.join(sorted({kw for kws in COLUMN_GROUPS.values() for kw in kws})),
+                          re.IGNORECASE)
+
+
+def build_col_index(columns):
+    """Map each keyword group to its matching columns (in frame order) in one pass"""
+    index = {group: [] for group in COLUMN_GROUPS}
+
+    for col in columns:
+        if not _ANY_KEYWORD.search(str(col)):
+            continue
+        for group, pattern in _GROUP_PATTERNS.items():
+            if pattern.search(str(col)):
+                index[group].append(col)
+
+    # A column naming both genders (e.g. a combined total) belongs to neither side,
+    # and gendered staff or facility columns (female_teacher, toilet_boys) are not pupils
+    excluded = (set(index['girl']) & set(index['boy'])) | set(index['facility']) | set(index['teacher'])
+    index['girl'] = [col for col in index['girl'] if col not in excluded]
+    index['boy'] = [col for col in index['boy'] if col not in excluded]
+
+    return {group: tuple(cols) for group, cols in index.items()}
@@ -0,0 +1,37 @@
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, fastmath=True, cache=True)
+def _group_sums(codes, num, den, n_groups, n_chunks):
+    chunk_size = (codes.size + n_chunks - 1) // n_chunks
+
+    # Each thread accumulates into its own row, so there are no write races
+    s_num = np.zeros((n_chunks, n_groups))
+    s_den = np.zeros((n_chunks, n_groups))
+    counts = np.zeros((n_chunks, n_groups), dtype=np.int64)
+    for t in numba.prange(n_chunks):
+        for i in range(t * chunk_size, min((t + 1) * chunk_size, codes.size)):
+            c = codes[i]
+            if c >= 0:
+                s_num[t, c] += num[i]
+                s_den[t, c] += den[i]
+                counts[t, c] += 1
+
+    return s_num.sum(axis=0), s_den.sum(axis=0), counts.sum(axis=0)
+
+
+def group_sums(codes, num, den, n_groups):
+    """Per-group sums of num and den plus row counts, skipping rows with a negative code"""
+    return _group_sums(codes, num, den, n_groups, numba.get_num_threads())
+
+
+@numba.njit(parallel=True, fastmath=True, cache=True)
+def total_ratio(num, den):
+    """Ratio of sum(num) to sum(den) in one fused pass"""
+    s_num = 0.0
+    s_den = 0.0
+    for i in numba.prange(num.size):
+        s_num += num[i]
+        s_den += den[i]
+    return s_num / (s_den + 1e-10)
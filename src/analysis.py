@@ -2,21 +2,53 @@
 import pandas as pd
 import numpy as np
 from scipy import stats
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.decomposition import PCA
 
+from ._columns import build_col_index
+from ._kernels import group_sums, total_ratio
+
 
 class EducationPolicyAnalyzer:
     """Analyze education data for policy insights"""
     
-    def __init__(self, data_path=None, df=None):
+    def __init__(self, data_path=None, df=None, columns=None):
         if df is not None:
             self.df = df
         elif data_path:
-            self.df = pd.read_csv(data_path)
+            self.df = self.load_data(data_path, columns=columns)
         else:
             self.df = None
+        
+        self._cat_cols = None
+        self._indexed_columns = None
+        self.cluster_labels_ = None
+    
+    @staticmethod
+    def load_data(data_path, columns=None):
+        """Load a processed dataset, reading only `columns` when given"""
+        if str(data_path).endswith('.parquet'):
+            # Parquet is columnar, so unused columns are never read or decompressed
+            return pd.read_parquet(data_path, columns=columns, engine='pyarrow')
+        return pd.read_csv(data_path, usecols=columns)
+    
+    def _col_index(self):
+        """Keyword group -> matching columns, rebuilt only when the columns change"""
+        if self._indexed_columns is not self.df.columns:
+            self._cat_cols = build_col_index(self.df.columns)
+            self._indexed_columns = self.df.columns
+        return self._cat_cols
+    
+    def _group_codes(self, col):
+        """Integer codes (-1 for missing) and labels of a grouping column"""
+        series = self.df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(), series.cat.categories
+        return pd.factorize(series, sort=True)
+    
+    def _row_totals(self, cols):
+        """Row-wise float32 sum of `cols`, with missing values counted as zero"""
+        return self.df[cols].to_numpy(dtype=np.float32, na_value=0).sum(axis=1)
     
     def calculate_enrolment_metrics(self, state_col='State', district_col='District', 
                                    gender_cols=None, class_cols=None):
@@ -27,26 +59,37 @@ class EducationPolicyAnalyzer:
         metrics = {}
         
         if gender_cols is None:
-            gender_cols = [col for col in self.df.columns if 'girl' in col.lower() or 
-                          'female' in col.lower() or 'boy' in col.lower() or 'male' in col.lower()]
+            gender_cols = list(self._col_index()['gender'])
 
         if len(gender_cols) >= 2:
-            girls_col = [col for col in gender_cols if 'girl' in col.lower() or 'female' in col.lower()]
-            boys_col = [col for col in gender_cols if 'boy' in col.lower() or 'male' in col.lower()]
-            
+            col_index = self._col_index()
+            girls_col = [col for col in gender_cols if col in col_index['girl']]
+            boys_col = [col for col in gender_cols if col in col_index['boy']]
+
             if girls_col and boys_col:
-                girls_total = self.df[girls_col[0]].sum() if len(girls_col) == 1 else self.df[girls_col].sum(axis=1)
-                boys_total = self.df[boys_col[0]].sum() if len(boys_col) == 1 else self.df[boys_col].sum(axis=1)
-                
-                metrics['gender_parity_index'] = girls_total / (boys_total + 1e-10)  # Avoid division by zero
+                metrics['gender_parity_index'] = total_ratio(self._row_totals(girls_col),
+                                                             self._row_totals(boys_col))
         
   
+        # Counting integer codes with bincount avoids hashing the group keys
         if state_col in self.df.columns:
-            state_enrolment = self.df.groupby(state_col).size()
-            metrics['state_enrolment'] = state_enrolment
+            s_codes, states = self._group_codes(state_col)
+            state_counts = np.bincount(s_codes[s_codes >= 0], minlength=len(states))
+            state_enrolment = pd.Series(state_counts, index=pd.Index(states, name=state_col))
+            metrics['state_enrolment'] = state_enrolment[state_counts > 0]
 
-        if district_col in self.df.columns:
-            district_enrolment = self.df.groupby([state_col, district_col]).size()
+        if state_col in self.df.columns and district_col in self.df.columns:
+            d_codes, districts = self._group_codes(district_col)
+            valid = (s_codes >= 0) & (d_codes >= 0)
+            pair_keys = s_codes[valid].astype(np.int64) * len(districts) + d_codes[valid]
+            pair_counts = np.bincount(pair_keys, minlength=len(states) * len(districts))
+            observed = np.flatnonzero(pair_counts)
+            s_idx, d_idx = np.divmod(observed, len(districts))
+            district_enrolment = pd.Series(
+                pair_counts[observed],
+                index=pd.MultiIndex.from_arrays([states[s_idx], districts[d_idx]],
+                                                names=[state_col, district_col])
+            )
             metrics['district_enrolment'] = district_enrolment
         
         return metrics
@@ -58,9 +101,9 @@ class EducationPolicyAnalyzer:
             return None
         
 
-        teacher_cols = [col for col in self.df.columns if 'teacher' in col.lower()]
-        student_cols = [col for col in self.df.columns if 'student' in col.lower() or 
-                       'enrolment' in col.lower() or 'enrolled' in col.lower()]
+        col_index = self._col_index()
+        teacher_cols = list(col_index['teacher'])
+        student_cols = list(col_index['student'])
         
         if not teacher_cols or not student_cols:
             return None
@@ -73,13 +116,17 @@ class EducationPolicyAnalyzer:
                 break
         
         if state_col:
-            aggregated = self.df.groupby(state_col).agg({
-                teacher_cols[0]: 'sum',
-                student_cols[0]: 'sum'
-            })
+            codes, states = self._group_codes(state_col)
+            teacher_sums, student_sums, counts = group_sums(
+                codes, self._row_totals([teacher_cols[0]]), self._row_totals([student_cols[0]]), len(states)
+            )
             
-            aggregated['TSR'] = aggregated[student_cols[0]] / (aggregated[teacher_cols[0]] + 1e-10)
-            return aggregated
+            aggregated = pd.DataFrame({
+                teacher_cols[0]: teacher_sums,
+                student_cols[0]: student_sums
+            }, index=pd.Index(states, name=state_col))
+            aggregated['TSR'] = student_sums / (teacher_sums + 1e-10)
+            return aggregated[counts > 0]
         
         return None
     
@@ -89,23 +136,26 @@ class EducationPolicyAnalyzer:
             return None
         
         if facility_cols is None:
-            facility_cols = [col for col in self.df.columns if any(keyword in col.lower() 
-                           for keyword in ['toilet', 'water', 'library', 'computer', 'internet', 'electricity'])]
+            facility_cols = list(self._col_index()['facility'])
         
         facility_analysis = {}
         
-        for col in facility_cols:
-            if self.df[col].dtype in ['object', 'string']:
-                
-                facility_analysis[col] = self.df[col].value_counts()
-            else:
-                
-                total = len(self.df)
-                available = (self.df[col] > 0).sum() if self.df[col].dtype in ['int64', 'float64'] else 0
-                facility_analysis[col] = {
-                    'available': available,
-                    'percentage': (available / total * 100) if total > 0 else 0
-                }
+        num_cols = self.df[facility_cols].select_dtypes(include=[np.number]).columns
+        obj_cols = [col for col in facility_cols if col not in num_cols]
+        
+        if len(num_cols):
+            # One reduction over the numeric facility block instead of a pass per column
+            block = self.df[num_cols].to_numpy(dtype=np.float32, na_value=np.nan)
+            available = (block > 0).sum(axis=0)
+            total = len(self.df)
+            percentage = available * (100.0 / total) if total > 0 else np.zeros(len(num_cols))
+            facility_analysis.update({
+                col: {'available': int(a), 'percentage': float(p)}
+                for col, a, p in zip(num_cols, available, percentage)
+            })
+        
+        for col in obj_cols:
+            facility_analysis[col] = self.df[col].value_counts()
         
         return facility_analysis
     
@@ -133,13 +183,17 @@ class EducationPolicyAnalyzer:
             return None
         
 
-        district_data = self.df.groupby([state_col, district_col]).agg({
-            col: ['count', 'sum', 'mean'] for col in self.df.select_dtypes(include=[np.number]).columns[:10]
-        }).reset_index()
+        # One sum and one count pass; means are derived instead of aggregated again
+        num_cols = self.df.select_dtypes(include=[np.number]).columns[:10]
+        g = self.df.groupby([state_col, district_col], observed=True, sort=False)
+        sums = g[num_cols].sum()
+        counts = g[num_cols].count()
+        means = sums / counts
+        district_data = pd.concat([sums, means, counts], axis=1, keys=['sum', 'mean', 'count'])
         
 
-        priority_scores['district'] = district_data[district_col]
-        priority_scores['state'] = district_data[state_col]
+        priority_scores['district'] = district_data.index.get_level_values(district_col)
+        priority_scores['state'] = district_data.index.get_level_values(state_col)
         priority_scores['priority_score'] = 0  
         
         return priority_scores.sort_values('priority_score')
@@ -155,15 +209,22 @@ class EducationPolicyAnalyzer:
             features = numeric_cols[:20]  
         
    
-        X = self.df[features].fillna(0)
+        # float32 keeps sklearn on its single-precision kmeans path
+        X = np.ascontiguousarray(self.df[features].to_numpy(dtype=np.float32, na_value=0, copy=True))
     
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        # Standardize in place instead of allocating a scaled copy
+        mean = X.mean(axis=0)
+        std = X.std(axis=0)
+        std[std < 1e-12] = 1.0
+        X -= mean
+        X *= 1.0 / std
       
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-        clusters = kmeans.fit_predict(X_scaled)
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096, n_init='auto',
+                                 random_state=42)
+        clusters = kmeans.fit_predict(X)
         
-        self.df['cluster'] = clusters
+        # Kept out of self.df so the frame itself is left untouched
+        self.cluster_labels_ = pd.Series(clusters, index=self.df.index, name='cluster', dtype='int16')
         
         return {
             'clusters': clusters,
@@ -171,6 +232,12 @@ class EducationPolicyAnalyzer:
             'inertia': kmeans.inertia_
         }
     
+    def df_with_cluster(self):
+        """Return the data with the latest cluster labels joined as a `cluster` column"""
+        if self.df is None or self.cluster_labels_ is None:
+            return None
+        return self.df.assign(cluster=self.cluster_labels_.values)
+    
     def calculate_equity_indicators(self):
         """Calculate equity indicators (rural-urban, gender, etc.)"""
         if self.df is None:
@@ -178,14 +245,13 @@ class EducationPolicyAnalyzer:
         
         equity_metrics = {}
 
-        rural_cols = [col for col in self.df.columns if 'rural' in col.lower()]
-        urban_cols = [col for col in self.df.columns if 'urban' in col.lower()]
+        col_index = self._col_index()
+        rural_cols = list(col_index['rural'])
+        urban_cols = list(col_index['urban'])
         
         if rural_cols and urban_cols:
-            rural_total = self.df[rural_cols[0]].sum() if len(rural_cols) == 1 else self.df[rural_cols].sum(axis=1).sum()
-            urban_total = self.df[urban_cols[0]].sum() if len(urban_cols) == 1 else self.df[urban_cols].sum(axis=1).sum()
-            
-            equity_metrics['rural_urban_ratio'] = rural_total / (urban_total + 1e-10)
+            equity_metrics['rural_urban_ratio'] = total_ratio(self._row_totals(rural_cols),
+                                                              self._row_totals(urban_cols))
         
         return equity_metrics
     
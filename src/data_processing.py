@@ -1,17 +1,30 @@
 import pandas as pd
 import numpy as np
+import io
 import os
+import json
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+
 
 class UDISEDataProcessor:
     """Process UDISE education datasets"""
     
+    # Zipped CSVs larger than this are extracted and parsed from disk in parallel blocks
+    _prefer_extract_threshold = 500_000_000
+    
     def __init__(self, data_dir='data/raw'):
         self.data_dir = Path(data_dir)
         self.processed_dir = Path('data/processed')
         self.processed_dir.mkdir(parents=True, exist_ok=True)
+        self.schema_dir = self.processed_dir / 'schemas'
+        self._schema_cache = {}
         
     def extract_zip_files(self, zip_path):
         """Extract zip files to a directory"""
@@ -23,8 +36,99 @@ class UDISEDataProcessor:
         
         return extract_dir
     
-    def load_from_zip(self, zip_path, encoding='utf-8'):
+    def _extract_csv(self, zip_path, z, csv_file):
+        """Extract one CSV from an archive, reusing an earlier extraction of the same size"""
+        extract_dir = self.data_dir / Path(zip_path).stem
+        csv_path = extract_dir / csv_file
+        if csv_path.exists() and csv_path.stat().st_size == z.getinfo(csv_file).file_size:
+            return csv_path
+        
+        print(f"Extracting {Path(zip_path).name}...")
+        return Path(z.extract(csv_file, path=extract_dir))
+    
+    def _read_header(self, z, csv_file, encoding):
+        """Read the column names of a CSV inside a zip archive"""
+        with z.open(csv_file) as f:
+            first_line = f.readline()
+        try:
+            header = first_line.decode(encoding)
+        except UnicodeDecodeError:
+            header = first_line.decode('latin-1')
+        return pd.read_csv(io.StringIO(header), nrows=0).columns.tolist()
+    
+    @staticmethod
+    def _arrow_types(schema):
+        """Convert a cached column->dtype schema to Arrow column types"""
+        return {col: pa.from_numpy_dtype(np.dtype(dtype)) for col, dtype in schema.items()}
+    
+    def _get_schema(self, z, csv_file, cache_key, encoding):
+        """Return the cached column->dtype schema for a zipped CSV, inferring it once"""
+        columns = self._read_header(z, csv_file, encoding)
+        
+        schema = self._schema_cache.get(cache_key)
+        schema_path = self.schema_dir / f'{Path(cache_key).stem}.json'
+        if schema is None and schema_path.exists():
+            with open(schema_path) as f:
+                schema = json.load(f)
+        
+        # Re-infer if the file's columns changed since the schema was cached, or if it
+        # predates float64-only pinning
+        if schema is not None and (set(schema) - set(columns)
+                                   or any(dtype != 'float64' for dtype in schema.values())):
+            schema = None
+        
+        if schema is None:
+            try:
+                with z.open(csv_file) as f:
+                    sample = pd.read_csv(f, nrows=10_000, encoding=encoding)
+            except UnicodeDecodeError:
+                with z.open(csv_file) as f:
+                    sample = pd.read_csv(f, nrows=10_000, encoding='latin-1')
+            
+            # Only numeric columns are pinned, and always as float64: a column that is
+            # integral in the sample may still hold decimals or blanks further down
+            schema = {col: 'float64' for col, dtype in sample.dtypes.items()
+                      if dtype.kind in 'iuf'}
+            self.schema_dir.mkdir(parents=True, exist_ok=True)
+            with open(schema_path, 'w') as f:
+                json.dump(schema, f, indent=2)
+        
+        self._schema_cache[cache_key] = schema
+        return schema
+    
+    @staticmethod
+    def _has_binary_fields(arrow_schema):
+        """Check for columns Arrow left as raw bytes because they failed to decode"""
+        return any(pa.types.is_binary(field.type) for field in arrow_schema)
+    
+    def _read_csv_file(self, csv_path, schema, encoding):
+        """Parse an extracted CSV with Arrow's multithreaded block reader"""
+        for enc in [encoding, 'latin-1']:
+            table = pacsv.read_csv(
+                csv_path,
+                read_options=pacsv.ReadOptions(use_threads=True, block_size=64 << 20, encoding=enc),
+                convert_options=pacsv.ConvertOptions(column_types=self._arrow_types(schema))
+            )
+            if not self._has_binary_fields(table.schema):
+                break
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    
+    def _read_zip_with_pandas(self, zip_path, encoding):
+        """Read the first CSV of a zip with pandas' whole-file type inference"""
+        with zipfile.ZipFile(zip_path, 'r') as z:
+            csv_files = [f for f in z.namelist() if f.endswith('.csv')]
+            if not csv_files:
+                return None
+            try:
+                with z.open(csv_files[0]) as f:
+                    return pd.read_csv(f, encoding=encoding, low_memory=False)
+            except UnicodeDecodeError:
+                with z.open(csv_files[0]) as f:
+                    return pd.read_csv(f, encoding='latin-1', low_memory=False)
+    
+    def load_from_zip(self, zip_path, encoding='utf-8', schema=None):
         """Load CSV from zip file"""
+        zip_path = Path(zip_path)
         try:
             with zipfile.ZipFile(zip_path, 'r') as z:
                 csv_files = [f for f in z.namelist() if f.endswith('.csv')]
@@ -33,63 +137,115 @@ class UDISEDataProcessor:
                 
                 # Read the first CSV file from zip
                 csv_file = csv_files[0]
-                try:
-                    # Try with utf-8 first
-                    with z.open(csv_file) as f:
-                        df = pd.read_csv(f, low_memory=False, encoding=encoding)
-                        return df
-                except UnicodeDecodeError:
-                    # Try with latin-1 encoding
-                    with z.open(csv_file) as f:
-                        df = pd.read_csv(f, low_memory=False, encoding='latin-1')
-                        return df
+                if schema is None:
+                    schema = self._get_schema(z, csv_file, zip_path.name, encoding)
+                
+                if z.getinfo(csv_file).file_size > self._prefer_extract_threshold:
+                    csv_path = Path(z.extract(csv_file, path=self.data_dir / '_tmp'))
+                    try:
+                        return self._read_csv_file(csv_path, schema, encoding)
+                    finally:
+                        csv_path.unlink(missing_ok=True)
+                
+                with z.open(csv_file) as f:
+                    df = pd.read_csv(f, engine='pyarrow', dtype_backend='pyarrow',
+                                     dtype=schema, encoding=encoding)
+                
+                # Arrow keeps text it cannot decode as raw bytes, so retry with latin-1
+                binary_cols = [col for col, dtype in df.dtypes.items()
+                               if isinstance(dtype, pd.ArrowDtype) and pa.types.is_binary(dtype.pyarrow_dtype)]
+                if not binary_cols:
+                    return df
+                
+                with z.open(csv_file) as f:
+                    table = pacsv.read_csv(
+                        f,
+                        read_options=pacsv.ReadOptions(encoding='latin-1'),
+                        convert_options=pacsv.ConvertOptions(column_types=self._arrow_types(schema))
+                    )
+                return table.to_pandas(types_mapper=pd.ArrowDtype)
+        except ValueError as e:
+            # A row past the sampled dtypes did not parse; re-read with pandas rather than drop the table
+            print(f"Sampled dtypes do not fit {zip_path.name} ({e}), re-reading with pandas")
+            try:
+                return self._read_zip_with_pandas(zip_path, encoding)
+            except Exception as e:
+                print(f"Error loading from {zip_path}: {e}")
+                return None
         except Exception as e:
             print(f"Error loading from {zip_path}: {e}")
             return None
     
+    def load_from_zips(self, zip_paths, encoding='utf-8'):
+        """Load the CSVs of several zip archives as a single Arrow dataset"""
+        csv_paths = []
+        schema = None
+        try:
+            for zip_path in zip_paths:
+                with zipfile.ZipFile(zip_path, 'r') as z:
+                    csv_files = [f for f in z.namelist() if f.endswith('.csv')]
+                    if not csv_files:
+                        continue
+                    if schema is None:
+                        schema = self._get_schema(z, csv_files[0], zip_path.name, encoding)
+                    csv_paths.append(str(self._extract_csv(zip_path, z, csv_files[0])))
+            
+            if not csv_paths:
+                return None
+            
+            # The dataset scans all parts in parallel into one table, so there is no concat copy
+            for enc in [encoding, 'latin-1']:
+                csv_format = ds.CsvFileFormat(
+                    read_options=pacsv.ReadOptions(encoding=enc),
+                    convert_options=pacsv.ConvertOptions(column_types=self._arrow_types(schema))
+                )
+                table = ds.dataset(csv_paths, format=csv_format).to_table(use_threads=True)
+                if not self._has_binary_fields(table.schema):
+                    break
+            
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        except ValueError as e:
+            print(f"Sampled dtypes do not fit {', '.join(p.name for p in zip_paths)} ({e}), re-reading with pandas")
+            try:
+                frames = [self._read_zip_with_pandas(zip_path, encoding) for zip_path in zip_paths]
+                frames = [frame for frame in frames if frame is not None]
+                return pd.concat(frames, ignore_index=True) if frames else None
+            except Exception as e:
+                print(f"Error loading from {', '.join(str(p) for p in zip_paths)}: {e}")
+                return None
+        except Exception as e:
+            print(f"Error loading from {', '.join(str(p) for p in zip_paths)}: {e}")
+            return None
+    
+    @cached_property
+    def _dataset_root(self):
+        """Directory holding the per-year UDISE folders"""
+        return self.data_dir / 'UDISE Education Dataset-20251108T185729Z-1-001' / 'UDISE Education Dataset'
+    
+    def _find_zips(self, year, pattern):
+        """List a year's zip archives matching `pattern` with one directory scan"""
+        return sorted((self._dataset_root / f'UDISE {year}').glob(pattern))
+    
     def load_enrolment_data(self, year='2024-25', file_num=None):
         """Load enrolment data from CSV files in zip archives"""
-        enrolment_zips = []
-        
-        base_path = self.data_dir / 'UDISE Education Dataset-20251108T185729Z-1-001' / 'UDISE Education Dataset' / f'UDISE {year}'
-        
-        if file_num:
-            pattern = f'enrolment_data_{file_num}_All State_{year}.zip'
-            zip_path = base_path / pattern
-            if zip_path.exists():
-                enrolment_zips.append(zip_path)
-        else:
-            for num in [1, 2]:
-                pattern = f'enrolment_data_{num}_All State_{year}.zip'
-                zip_path = base_path / pattern
-                if zip_path.exists():
-                    enrolment_zips.append(zip_path)
+        part = file_num if file_num else '*'
+        enrolment_zips = self._find_zips(year, f'enrolment_data_{part}_All State_{year}.zip')
         
         if not enrolment_zips:
             print(f"No enrolment data found for {year}")
             return None
         
-        dfs = []
-        for zip_path in enrolment_zips:
-            print(f"Loading {zip_path.name}...")
-            df = self.load_from_zip(zip_path)
-            if df is not None:
-                print(f"  Loaded {len(df):,} rows, {len(df.columns)} columns")
-                dfs.append(df)
-        
-        if dfs:
-            print(f"Combining {len(dfs)} enrolment datasets...")
-            combined_df = pd.concat(dfs, ignore_index=True)
-            print(f"  Combined dataset: {len(combined_df):,} rows, {len(combined_df.columns)} columns")
-            return combined_df
-        return None
+        combined_df = self.load_from_zips(enrolment_zips)
+        if combined_df is not None:
+            print(f"  Combined enrolment dataset: {len(combined_df):,} rows, {len(combined_df.columns)} columns")
+        return combined_df
     
     def load_facility_data(self, year='2024-25'):
         """Load facility/infrastructure data from zip archive"""
-        base_path = self.data_dir / 'UDISE Education Dataset-20251108T185729Z-1-001' / 'UDISE Education Dataset' / f'UDISE {year}'
-        zip_path = base_path / f'facility_data_All State_{year}.zip'
+        facility_zips = self._find_zips(year, f'facility_data_All State_{year}.zip')
         
-        if zip_path.exists():
+        if facility_zips:
+            zip_path = facility_zips[0]
             print(f"Loading {zip_path.name}...")
             df = self.load_from_zip(zip_path)
             if df is not None:
@@ -101,10 +257,10 @@ class UDISEDataProcessor:
     
     def load_teacher_data(self, year='2024-25'):
         """Load teacher data from zip archive"""
-        base_path = self.data_dir / 'UDISE Education Dataset-20251108T185729Z-1-001' / 'UDISE Education Dataset' / f'UDISE {year}'
-        zip_path = base_path / f'teacher_data_All State_{year}.zip'
+        teacher_zips = self._find_zips(year, f'teacher_data_All State_{year}.zip')
         
-        if zip_path.exists():
+        if teacher_zips:
+            zip_path = teacher_zips[0]
             print(f"Loading {zip_path.name}...")
             df = self.load_from_zip(zip_path)
             if df is not None:
@@ -116,40 +272,25 @@ class UDISEDataProcessor:
     
     def load_profile_data(self, year='2024-25', file_num=None):
         """Load school profile data from zip archives"""
-        profile_zips = []
-        
-        base_path = self.data_dir / 'UDISE Education Dataset-20251108T185729Z-1-001' / 'UDISE Education Dataset' / f'UDISE {year}'
-        
-        if file_num:
-            pattern = f'profile_data_{file_num}_All State_{year}.zip'
-            zip_path = base_path / pattern
-            if zip_path.exists():
-                profile_zips.append(zip_path)
-        else:
-            for num in [1, 2]:
-                pattern = f'profile_data_{num}_All State_{year}.zip'
-                zip_path = base_path / pattern
-                if zip_path.exists():
-                    profile_zips.append(zip_path)
+        part = file_num if file_num else '*'
+        profile_zips = self._find_zips(year, f'profile_data_{part}_All State_{year}.zip')
         
         if not profile_zips:
             print(f"No profile data found for {year}")
             return None
         
-        dfs = []
-        for zip_path in profile_zips:
-            print(f"Loading {zip_path.name}...")
-            df = self.load_from_zip(zip_path)
-            if df is not None:
-                print(f"  Loaded {len(df):,} rows, {len(df.columns)} columns")
-                dfs.append(df)
-        
-        if dfs:
-            print(f"Combining {len(dfs)} profile datasets...")
-            combined_df = pd.concat(dfs, ignore_index=True)
-            print(f"  Combined dataset: {len(combined_df):,} rows, {len(combined_df.columns)} columns")
-            return combined_df
-        return None
+        combined_df = self.load_from_zips(profile_zips)
+        if combined_df is not None:
+            print(f"  Combined profile dataset: {len(combined_df):,} rows, {len(combined_df.columns)} columns")
+        return combined_df
+    
+    @staticmethod
+    def _looks_numeric(series, sample_size=64):
+        """Check whether most of a column's first non-null values start like numbers"""
+        sample = series.dropna().head(sample_size).astype(str)
+        if sample.empty:
+            return False
+        return sample.str.match(r'^\s*[-+]?\.?\d').mean() >= 0.5
     
     def clean_data(self, df):
         """Basic data cleaning operations"""
@@ -158,20 +299,41 @@ class UDISEDataProcessor:
     
         df = df.dropna(how='all')
         df = df.dropna(axis=1, how='all')
+        
+        # Geographic keys become categoricals so later groupbys hash integer codes.
+        # This has to happen before the numeric coercion below, which would turn them into NaN.
+        for col in ['State', 'state', 'STATE', 'State_Name',
+                    'District', 'district', 'DISTRICT', 'District_Name']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
      
-        numeric_cols = df.select_dtypes(include=[object]).columns
-        for col in numeric_cols:
-            try:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            except:
-                pass
+        # Only coerce text columns whose leading values look numeric, in parallel
+        obj_cols = df.select_dtypes(include=['object', 'string']).columns.tolist()
+        candidate_cols = [col for col in obj_cols if self._looks_numeric(df[col])]
+        if candidate_cols:
+            with ThreadPoolExecutor() as executor:
+                converted = list(executor.map(
+                    lambda col: pd.to_numeric(df[col], errors='coerce'), candidate_cols
+                ))
+            df = df.assign(**dict(zip(candidate_cols, converted)))
         
         return df
     
+    @staticmethod
+    def _join_key(key):
+        """Cast a complete, integral join key to plain int64 so merges hash integers"""
+        if not pd.api.types.is_numeric_dtype(key.dtype) or key.isna().any():
+            return key
+        if pd.api.types.is_float_dtype(key.dtype):
+            values = key.to_numpy(dtype=np.float64)
+            if not np.array_equal(values, np.floor(values)):
+                return key
+        return key.astype('int64')
+    
     def merge_datasets(self, profile_df, enrolment_df, facility_df, teacher_df, 
                       merge_key='School_Code' or 'DISE_Code' or 'UDISE_Code'):
         """Merge different datasets on common key"""
-        merged_df = profile_df.copy()
+        merged_df = profile_df
         
         # Try different possible merge keys
         possible_keys = ['pseudocode', 'School_Code', 'DISE_Code', 'UDISE_Code', 
@@ -187,17 +349,30 @@ class UDISEDataProcessor:
             print("Warning: No common merge key found. Using index merge.")
             return merged_df
         
-        if enrolment_df is not None and merge_key in enrolment_df.columns:
-            merged_df = merged_df.merge(enrolment_df, on=merge_key, how='left', suffixes=('', '_enrol'))
+        left_key = self._join_key(profile_df[merge_key])
+        if left_key.dtype != profile_df[merge_key].dtype:
+            merged_df = profile_df.assign(**{merge_key: left_key})
         
-        if facility_df is not None and merge_key in facility_df.columns:
-            merged_df = merged_df.merge(facility_df, on=merge_key, how='left', suffixes=('', '_facility'))
+        # Right frames are indexed by the key so each merge is a single-key hash join
+        for rhs_df, suffix in [(enrolment_df, '_enrol'), (facility_df, '_facility'), (teacher_df, '_teacher')]:
+            if rhs_df is None or merge_key not in rhs_df.columns:
+                continue
+            rhs = rhs_df.set_index(self._join_key(rhs_df[merge_key])).drop(columns=merge_key)
+            merged_df = merged_df.merge(rhs, left_on=merge_key, right_index=True, how='left',
+                                        suffixes=('', suffix), sort=False)
         
-        if teacher_df is not None and merge_key in teacher_df.columns:
-            merged_df = merged_df.merge(teacher_df, on=merge_key, how='left', suffixes=('', '_teacher'))
+        if merged_df is not profile_df:
+            merged_df.index = pd.RangeIndex(len(merged_df))
         
         return merged_df
     
+    def save_parquet(self, df, name):
+        """Write a processed dataset to zstd-compressed Parquet"""
+        path = self.processed_dir / f'{name}.parquet'
+        df.to_parquet(path, engine='pyarrow', compression='zstd', compression_level=3,
+                      row_group_size=128_000, index=False)
+        return path
+    
     def process_all_data(self, year='2024-25'):
         """Process all datasets for a given year"""
         print(f"Processing UDISE data for {year}...")
@@ -213,21 +388,21 @@ class UDISEDataProcessor:
         teacher_df = self.clean_data(teacher_df)
      
         if profile_df is not None:
-            profile_df.to_csv(self.processed_dir / f'profile_{year}.csv', index=False)
+            self.save_parquet(profile_df, f'profile_{year}')
         
         if enrolment_df is not None:
-            enrolment_df.to_csv(self.processed_dir / f'enrolment_{year}.csv', index=False)
+            self.save_parquet(enrolment_df, f'enrolment_{year}')
         
         if facility_df is not None:
-            facility_df.to_csv(self.processed_dir / f'facility_{year}.csv', index=False)
+            self.save_parquet(facility_df, f'facility_{year}')
         
         if teacher_df is not None:
-            teacher_df.to_csv(self.processed_dir / f'teacher_{year}.csv', index=False)
+            self.save_parquet(teacher_df, f'teacher_{year}')
         
     
         if profile_df is not None:
             merged_df = self.merge_datasets(profile_df, enrolment_df, facility_df, teacher_df)
-            merged_df.to_csv(self.processed_dir / f'merged_{year}.csv', index=False)
+            self.save_parquet(merged_df, f'merged_{year}')
             print(f"Processed and saved merged dataset for {year}")
             return merged_df
         
@@ -6,6 +6,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.offline as pyo
+import plotly.io as pio
+
+from ._columns import build_col_index
 
 
 class EducationVisualizer:
@@ -14,11 +17,34 @@ class EducationVisualizer:
     def __init__(self, df=None, output_dir='visualizations'):
         self.df = df
         self.output_dir = output_dir
+        self._cat_cols = None
+        self._indexed_columns = None
         import os
         os.makedirs(output_dir, exist_ok=True)
         
         sns.set_style("whitegrid")
         plt.rcParams['figure.figsize'] = (12, 6)
+        
+        pio.json.config.default_engine = 'orjson'
+    
+    def _col_index(self):
+        """Keyword group -> matching columns, rebuilt only when the columns change"""
+        if self._indexed_columns is not self.df.columns:
+            self._cat_cols = build_col_index(self.df.columns)
+            self._indexed_columns = self.df.columns
+        return self._cat_cols
+    
+    def _write_html(self, fig, filename):
+        """Write a figure that loads plotly.js from the CDN instead of embedding it"""
+        fig.write_html(f"{self.output_dir}/{filename}", include_plotlyjs='cdn', full_html=True,
+                       auto_open=False, validate=False)
+    
+    def _group_codes(self, col):
+        """Integer codes (-1 for missing) and labels of a grouping column"""
+        series = self.df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(), series.cat.categories
+        return pd.factorize(series, sort=True)
     
     def plot_state_comparison(self, metric_col, title="State-wise Comparison", 
                              top_n=10, ascending=False):
@@ -35,7 +61,7 @@ class EducationVisualizer:
         if not state_col:
             return None
   
-        state_data = self.df.groupby(state_col)[metric_col].sum().reset_index()
+        state_data = self.df.groupby(state_col, observed=True, sort=False)[metric_col].sum().reset_index()
         state_data = state_data.sort_values(metric_col, ascending=ascending).head(top_n)
 
         fig = px.bar(state_data, x=state_col, y=metric_col,
@@ -50,7 +76,7 @@ class EducationVisualizer:
             showlegend=False
         )
         
-        fig.write_html(f"{self.output_dir}/state_comparison_{metric_col}.html")
+        self._write_html(fig, f"state_comparison_{metric_col}.html")
         return fig
     
     def plot_district_heatmap(self, metric_col, state_col='State'):
@@ -68,20 +94,17 @@ class EducationVisualizer:
         if not district_col:
             return None
      
-        pivot_data = self.df.pivot_table(
-            values=metric_col,
-            index=state_col,
-            columns=district_col,
-            aggfunc='mean'
-        )
-        
+        # One row per observed (state, district) pair instead of a mostly-NaN state x district grid
+        agg = self.df.groupby([state_col, district_col], observed=True, sort=False)[metric_col].mean().reset_index()
+        agg[metric_col] = agg[metric_col].astype(np.float32)
    
-        fig = px.imshow(pivot_data,
-                       labels=dict(x="District", y="State", color=metric_col),
-                       title=f"District-wise {metric_col.replace('_', ' ').title()} Heatmap",
-                       color_continuous_scale='RdYlGn_r')
+        fig = px.density_heatmap(agg, x=district_col, y=state_col, z=metric_col, histfunc='avg',
+                                 nbinsx=min(200, agg[district_col].nunique()),
+                                 labels={district_col: "District", state_col: "State"},
+                                 title=f"District-wise {metric_col.replace('_', ' ').title()} Heatmap",
+                                 color_continuous_scale='RdYlGn_r')
         
-        fig.write_html(f"{self.output_dir}/district_heatmap_{metric_col}.html")
+        self._write_html(fig, f"district_heatmap_{metric_col}.html")
         return fig
     
     def plot_gender_parity(self, girls_col=None, boys_col=None):
@@ -90,9 +113,9 @@ class EducationVisualizer:
             return None
        
         if girls_col is None:
-            girls_col = [col for col in self.df.columns if 'girl' in col.lower() or 'female' in col.lower()]
+            girls_col = list(self._col_index()['girl'])
         if boys_col is None:
-            boys_col = [col for col in self.df.columns if 'boy' in col.lower() or 'male' in col.lower()]
+            boys_col = list(self._col_index()['boy'])
         
         if not girls_col or not boys_col:
             return None
@@ -106,13 +129,28 @@ class EducationVisualizer:
         if not state_col:
             return None
         
-        state_gender = self.df.groupby(state_col).agg({
-            girls_col[0] if isinstance(girls_col, list) else girls_col: 'sum',
-            boys_col[0] if isinstance(boys_col, list) else boys_col: 'sum'
-        }).reset_index()
+        girls_col = [girls_col] if isinstance(girls_col, str) else list(girls_col)
+        boys_col = [boys_col] if isinstance(boys_col, str) else list(boys_col)
+
+        shared = set(girls_col) & set(boys_col)
+        if shared:
+            raise ValueError(f"Columns counted as both girls and boys: {sorted(shared)}")
+
+        # Sum every girls/boys column per row, then reduce per state with weighted bincounts
+        girls = self.df[girls_col].to_numpy(dtype=np.float32, na_value=0).sum(axis=1)
+        boys = self.df[boys_col].to_numpy(dtype=np.float32, na_value=0).sum(axis=1)
         
-        state_gender['GPI'] = state_gender[girls_col[0] if isinstance(girls_col, list) else girls_col] / \
-                             (state_gender[boys_col[0] if isinstance(boys_col, list) else boys_col] + 1e-10)
+        codes, states = self._group_codes(state_col)
+        valid = codes >= 0
+        n_states = len(states)
+        girls_sum = np.bincount(codes[valid], weights=girls[valid], minlength=n_states)
+        boys_sum = np.bincount(codes[valid], weights=boys[valid], minlength=n_states)
+        observed = np.bincount(codes[valid], minlength=n_states) > 0
+        
+        state_gender = pd.DataFrame({
+            state_col: np.asarray(states)[observed],
+            'GPI': (girls_sum / (boys_sum + 1e-10))[observed]
+        })
       
         fig = px.bar(state_gender, x=state_col, y='GPI',
                     title='Gender Parity Index by State',
@@ -125,7 +163,7 @@ class EducationVisualizer:
                      annotation_text="Parity Line")
         
         fig.update_layout(height=600, xaxis_tickangle=-45)
-        fig.write_html(f"{self.output_dir}/gender_parity.html")
+        self._write_html(fig, "gender_parity.html")
         return fig
     
     def plot_facility_coverage(self, facility_cols=None):
@@ -134,8 +172,7 @@ class EducationVisualizer:
             return None
         
         if facility_cols is None:
-            facility_cols = [col for col in self.df.columns if any(keyword in col.lower() 
-                           for keyword in ['toilet', 'water', 'library', 'computer', 'internet'])]
+            facility_cols = list(self._col_index()['plotted_facility'])
         
         if not facility_cols:
             return None
@@ -149,17 +186,23 @@ class EducationVisualizer:
         if not state_col:
             return None
         
-        facility_coverage = []
-        for facility in facility_cols[:5]:  
-            state_facility = self.df.groupby(state_col).agg({
-                facility: lambda x: (x > 0).sum() if x.dtype in ['int64', 'float64'] else x.notna().sum()
-            }).reset_index()
-            state_facility['total_schools'] = self.df.groupby(state_col).size().values
-            state_facility['coverage_pct'] = (state_facility[facility] / state_facility['total_schools'] * 100)
-            state_facility['facility'] = facility
-            facility_coverage.append(state_facility)
-        
-        coverage_df = pd.concat(facility_coverage, ignore_index=True)
+        fac_cols = facility_cols[:5]
+        num_cols = self.df[fac_cols].select_dtypes(include=[np.number]).columns
+        
+        # Numeric facilities count as available when > 0, others when present
+        mask = self.df[fac_cols].notna()
+        if len(num_cols):
+            mask[num_cols] = self.df[num_cols].to_numpy(dtype=np.float32, na_value=np.nan) > 0
+        
+        # Availability and totals come from the same grouping, so they always line up
+        by_state = mask.groupby(self.df[state_col], observed=True, sort=False)
+        avail = by_state.sum()
+        totals = by_state.size()
+        pct = avail.div(totals, axis=0) * 100.0
+        
+        coverage_df = pct.rename_axis(index=state_col).reset_index().melt(
+            id_vars=state_col, value_vars=fac_cols, var_name='facility', value_name='coverage_pct'
+        )
        
         fig = px.bar(coverage_df, x=state_col, y='coverage_pct', color='facility',
                     title='Facility Coverage by State',
@@ -167,7 +210,7 @@ class EducationVisualizer:
                     barmode='group')
         
         fig.update_layout(height=600, xaxis_tickangle=-45)
-        fig.write_html(f"{self.output_dir}/facility_coverage.html")
+        self._write_html(fig, "facility_coverage.html")
         return fig
     
     def plot_teacher_student_ratio(self):
@@ -200,7 +243,7 @@ class EducationVisualizer:
             showlegend=True
         )
         
-        fig.write_html(f"{self.output_dir}/{output_file}")
+        self._write_html(fig, output_file)
         return fig
     
     def plot_trend_analysis(self, year_col=None, metric_col=None):
@@ -2,279 +2,400 @@
 
 import pandas as pd
 import numpy as np
+import polars as pl
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from pathlib import Path
 import os
-
-print("=" * 80)
-print("CREATING VISUALIZATIONS - UDISE 2024-25")
-print("=" * 80)
-
-output_dir = Path('visualizations')
-output_dir.mkdir(exist_ok=True)
-
-print("\nLoading data...")
-df = pd.read_csv('data/processed/merged_2024-25.csv', low_memory=False)
-print(f"Loaded: {df.shape[0]:,} schools")
-
-print("\n1. Creating state-wise school distribution chart...")
-
-state_counts = df['state'].value_counts().reset_index()
-state_counts.columns = ['State', 'School_Count']
-state_counts = state_counts.sort_values('School_Count', ascending=False)
-
-fig1 = px.bar(
-    state_counts.head(20),
-    x='State',
-    y='School_Count',
-    title='Top 20 States by School Count (UDISE 2024-25)',
-    labels={'School_Count': 'Number of Schools', 'State': 'State'},
-    color='School_Count',
-    color_continuous_scale='Viridis'
-)
-fig1.update_layout(
-    xaxis_tickangle=-45,
-    height=600,
-    showlegend=False,
-    title_font_size=16
-)
-fig1.write_html(str(output_dir / '01_state_school_distribution.html'))
-print("   Saved: 01_state_school_distribution.html")
-
-print("\n2. Creating rural-urban distribution chart...")
-
-ru_counts = df['rural_urban'].value_counts().sort_index()
-ru_labels = {1.0: 'Rural', 2.0: 'Urban'}
-ru_data = pd.DataFrame({
-    'Type': [ru_labels.get(k, f'Type {k}') for k in ru_counts.index],
-    'Count': ru_counts.values,
-    'Percentage': (ru_counts.values / len(df) * 100).round(1)
-})
-
-fig2 = px.pie(
-    ru_data,
-    values='Count',
-    names='Type',
-    title='Rural-Urban School Distribution',
-    hole=0.4
-)
-fig2.update_traces(textposition='inside', textinfo='percent+label')
-fig2.update_layout(height=500)
-fig2.write_html(str(output_dir / '02_rural_urban_distribution.html'))
-print("   Saved: 02_rural_urban_distribution.html")
-
-
-print("\n3. Creating state-wise rural-urban breakdown...")
-
-state_ru = df.groupby(['state', 'rural_urban']).size().reset_index(name='count')
-state_ru['Type'] = state_ru['rural_urban'].map(ru_labels).fillna('Other')
-state_ru = state_ru[state_ru['state'].isin(state_counts.head(15)['State'].values)]
-
-fig3 = px.bar(
-    state_ru,
-    x='state',
-    y='count',
-    color='Type',
-    title='Rural-Urban Distribution by State (Top 15 States)',
-    labels={'count': 'Number of Schools', 'state': 'State'},
-    barmode='group'
-)
-fig3.update_layout(
-    xaxis_tickangle=-45,
-    height=600
-)
-fig3.write_html(str(output_dir / '03_state_rural_urban.html'))
-print("   Saved: 03_state_rural_urban.html")
-
-
-print("\n4. Creating district-wise distribution for top states...")
-
-top_states = state_counts.head(5)['State'].tolist()
-district_counts = df[df['state'].isin(top_states)].groupby(['state', 'district']).size().reset_index(name='school_count')
-district_counts = district_counts.sort_values('school_count', ascending=False).head(30)
-
-fig4 = px.bar(
-    district_counts,
-    x='district',
-    y='school_count',
-    color='state',
-    title='Top 30 Districts by School Count (Top 5 States)',
-    labels={'school_count': 'Number of Schools', 'district': 'District'},
-    barmode='group'
-)
-fig4.update_layout(
-    xaxis_tickangle=-45,
-    height=700
-)
-fig4.write_html(str(output_dir / '04_top_districts.html'))
-print("   Saved: 04_top_districts.html")
-
-
-print("\n5. Creating school type distribution...")
-
-if 'school_type' in df.columns:
-    type_counts = df['school_type'].value_counts().head(10).reset_index()
-    type_counts.columns = ['School_Type', 'Count']
-    
-    fig5 = px.bar(
-        type_counts,
-        x='School_Type',
-        y='Count',
-        title='School Type Distribution (Top 10)',
-        labels={'Count': 'Number of Schools', 'School_Type': 'School Type'},
-        color='Count',
-        color_continuous_scale='Blues'
+import multiprocessing
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import plotly.io as pio
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# orjson serializes the figure data in C; worker processes pick this up on import
+pio.json.config.default_engine = 'orjson'
+
+
+# Plotly.js config shared by every chart page; a 1x WebGL pixel ratio keeps
+# the scattergl bubble chart cheap to redraw on high-DPI screens
+CHART_CONFIG = {'responsive': True, 'plotGlPixelRatio': 1}
+
+# Plotly serializes every row it is given, so charts only ever get aggregated frames
+MAX_PLOT_ROWS = 2000
+
+
+def write_chart(fig_dict, path, include_plotlyjs='cdn'):
+    """Serialize one figure to a standalone HTML file (runs in a worker process)"""
+    pio.write_html(fig_dict, path, config=CHART_CONFIG, include_plotlyjs=include_plotlyjs,
+                   full_html=True, include_mathjax=False, auto_play=False, validate=False)
+
+
+def main():
+    print("=" * 80)
+    print("CREATING VISUALIZATIONS - UDISE 2024-25")
+    print("=" * 80)
+
+    output_dir = Path('visualizations')
+    output_dir.mkdir(exist_ok=True)
+
+    print("\nLoading data...")
+    merged_path = Path('data/processed/merged_2024-25.parquet')
+    legacy_csv_path = merged_path.with_suffix('.csv')
+
+    # One-shot conversion for trees that still only have the merged CSV, streamed
+    # in batches so a CSV larger than RAM never has to be loaded whole. Types are
+    # inferred from every row, and the file only replaces merged_path once complete
+    if not merged_path.exists() and legacy_csv_path.exists():
+        print(f"Converting {legacy_csv_path.name} to Parquet (one-time)...")
+        tmp_path = merged_path.with_suffix('.parquet.tmp')
+        try:
+            pl.scan_csv(legacy_csv_path, infer_schema_length=None).sink_parquet(
+                tmp_path, compression='zstd', row_group_size=1_000_000
+            )
+            os.replace(tmp_path, merged_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    # Aggregations run as lazy Polars queries over only the columns the charts use;
+    # just the small result frames are converted to pandas for Plotly
+    wanted_cols = ['pseudocode', 'state', 'district', 'rural_urban', 'school_type', 'school_category']
+    available_cols = set(pq.read_schema(merged_path).names)
+    load_cols = [col for col in wanted_cols if col in available_cols]
+    # Text keys are grouped as categoricals so Polars hashes integer codes instead of strings,
+    # and rural_urban is held as uint8 codes (1=Rural, 2=Urban, 0=missing)
+    lf = pl.scan_parquet(merged_path).select(load_cols).with_columns(
+        pl.col(pl.String).cast(pl.Categorical),
+        pl.col('rural_urban').cast(pl.Float32).fill_nan(None).fill_null(0).cast(pl.UInt8)
     )
-    fig5.update_layout(height=500, showlegend=False)
-    fig5.write_html(str(output_dir / '05_school_types.html'))
-    print("   Saved: 05_school_types.html")
-
-print("\n6. Creating school category distribution...")
 
-if 'school_category' in df.columns:
-    cat_counts = df['school_category'].value_counts().head(10).reset_index()
-    cat_counts.columns = ['Category', 'Count']
-    cat_counts['Percentage'] = (cat_counts['Count'] / len(df) * 100).round(1)
+    print("\nAggregating...")
+
+    # Every aggregation is declared up front and collected together, so Polars
+    # plans them as one job over a shared scan instead of one pass per chart.
+    # The streaming engine processes the file in batches, keeping memory bounded
+    queries = {
+        'total': lf.select(pl.len()),
+        'rural_urban': lf.filter(pl.col('rural_urban') > 0).group_by('rural_urban').len().sort('rural_urban'),
+        'state_rural_urban': (
+            lf.drop_nulls('state')
+            .group_by(['state', 'rural_urban']).len(name='count')
+            .sort(['state', 'rural_urban'])
+        ),
+        'state_district': lf.drop_nulls('district').group_by(['state', 'district']).len(name='school_count'),
+        'state_summary': (
+            lf.drop_nulls('state')
+            .group_by('state')
+            .agg(
+                pl.col('pseudocode').count().alias('Total_Schools'),
+                (pl.col('rural_urban') == 1).sum().alias('Rural_Schools'),
+                (pl.col('rural_urban') == 2).sum().alias('Urban_Schools'),
+            )
+            .with_columns(
+                (pl.col('Rural_Schools') / pl.col('Total_Schools') * 100).round(1).alias('Rural_Percentage')
+            )
+            .sort('Total_Schools', descending=True)
+        ),
+    }
+    for col in ['school_type', 'school_category']:
+        if col in load_cols:
+            queries[col] = lf.drop_nulls(col).group_by(col).len().sort('len', descending=True).head(10)
+
+    frames = pl.collect_all(list(queries.values()), engine='streaming')
+    results = dict(zip(queries, (frame.to_pandas() for frame in frames)))
+
+    n_schools = results['total'].iloc[0, 0]
+    print(f"Loaded: {n_schools:,} schools")
+
+    # Each figure is handed to a worker process as soon as it is built, so its
+    # serialization and HTML write overlap with building the next chart. Pages load
+    # plotly.js from the CDN; the dashboard loads a shared copy saved next to it.
+    # Workers are spawned, not forked, since Polars' thread pool is already running
+    with ProcessPoolExecutor(max_workers=min(9, os.cpu_count() or 1),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {}
+
+        def save_chart(fig, name, include_plotlyjs='cdn'):
+            """Queue a figure to be written to output_dir/name in the background"""
+            future = executor.submit(write_chart, fig.to_plotly_json(), str(output_dir / name), include_plotlyjs)
+            futures[future] = name
+
+        print("\n1. Creating state-wise school distribution chart...")
+
+        # Per-state totals are summed from the state x rural_urban counts (missing
+        # rural_urban included) rather than grouping every school by state again
+        state_ru_all = results['state_rural_urban']
+        state_counts = (
+            state_ru_all.groupby('state', observed=True, sort=False)['count'].sum()
+            .sort_values(ascending=False)
+            .rename_axis('State').reset_index(name='School_Count')
+        )
+        top20_states = state_counts.head(20)
+        top15_states = state_counts.head(15)
+        # Membership sets for the top-state filters, built once; the state columns they
+        # filter are categorical, so isin only has to look up the category codes
+        top15_set = frozenset(top15_states['State'].tolist())
+        top5_set = frozenset(state_counts['State'].head(5).tolist())
+
+        assert len(top20_states) < MAX_PLOT_ROWS
+        fig1 = px.bar(
+            top20_states,
+            x='State',
+            y='School_Count',
+            title='Top 20 States by School Count (UDISE 2024-25)',
+            labels={'School_Count': 'Number of Schools', 'State': 'State'},
+            color='School_Count',
+            color_continuous_scale='Viridis'
+        )
+        fig1.update_layout(
+            xaxis_tickangle=-45,
+            height=600,
+            showlegend=False,
+            title_font_size=16
+        )
+        save_chart(fig1, '01_state_school_distribution.html')
+
+        print("\n2. Creating rural-urban distribution chart...")
+
+        ru_counts = results['rural_urban']
+        ru_labels = {1: 'Rural', 2: 'Urban'}
+        ru_data = pd.DataFrame({
+            'Type': [ru_labels.get(k, f'Type {k}') for k in ru_counts['rural_urban']],
+            'Count': ru_counts['len'].values,
+            'Percentage': (ru_counts['len'].values / n_schools * 100).round(1)
+        })
+
+        assert len(ru_data) < MAX_PLOT_ROWS
+        fig2 = px.pie(
+            ru_data,
+            values='Count',
+            names='Type',
+            title='Rural-Urban School Distribution',
+            hole=0.4
+        )
+        fig2.update_traces(textposition='inside', textinfo='percent+label')
+        fig2.update_layout(height=500)
+        save_chart(fig2, '02_rural_urban_distribution.html')
+
+
+        print("\n3. Creating state-wise rural-urban breakdown...")
+
+        state_ru = state_ru_all[(state_ru_all['rural_urban'] > 0)
+                                & state_ru_all['state'].isin(top15_set)]
+        state_ru = state_ru.assign(Type=state_ru['rural_urban'].map(ru_labels).fillna('Other'))
+
+        assert len(state_ru) < MAX_PLOT_ROWS
+        fig3 = px.bar(
+            state_ru,
+            x='state',
+            y='count',
+            color='Type',
+            title='Rural-Urban Distribution by State (Top 15 States)',
+            labels={'count': 'Number of Schools', 'state': 'State'},
+            barmode='group'
+        )
+        fig3.update_layout(
+            xaxis_tickangle=-45,
+            height=600
+        )
+        save_chart(fig3, '03_state_rural_urban.html')
+
+
+        print("\n4. Creating district-wise distribution for top states...")
+
+        district_counts = results['state_district']
+        district_counts = district_counts[district_counts['state'].isin(top5_set)]
+        district_counts = district_counts.nlargest(30, 'school_count')
+
+        assert len(district_counts) < MAX_PLOT_ROWS
+        fig4 = px.bar(
+            district_counts,
+            x='district',
+            y='school_count',
+            color='state',
+            title='Top 30 Districts by School Count (Top 5 States)',
+            labels={'school_count': 'Number of Schools', 'district': 'District'},
+            barmode='group'
+        )
+        fig4.update_layout(
+            xaxis_tickangle=-45,
+            height=700
+        )
+        save_chart(fig4, '04_top_districts.html')
+
+
+        print("\n5. Creating school type distribution...")
+
+        if 'school_type' in load_cols:
+            type_counts = results['school_type'].copy()
+            type_counts.columns = ['School_Type', 'Count']
+            type_top5 = type_counts.head(5)
     
-    fig6 = px.bar(
-        cat_counts,
-        x='Category',
-        y='Count',
-        title='School Category Distribution (Top 10)',
-        labels={'Count': 'Number of Schools', 'Category': 'Category'},
-        text='Percentage'
-    )
-    fig6.update_traces(textposition='outside', texttemplate='%{text}%')
-    fig6.update_layout(height=500, showlegend=False)
-    fig6.write_html(str(output_dir / '06_school_categories.html'))
-    print("   Saved: 06_school_categories.html")
-
-print("\n7. Creating state-wise school density visualization...")
-
-state_density = state_counts.copy()
-state_density['Density_Rank'] = state_density['School_Count'].rank(ascending=False)
-
-fig7 = px.scatter(
-    state_density.head(20),
-    x='State',
-    y='School_Count',
-    size='School_Count',
-    color='School_Count',
-    title='School Distribution by State (Bubble Chart)',
-    labels={'School_Count': 'Number of Schools', 'State': 'State'},
-    color_continuous_scale='Reds'
-)
-fig7.update_layout(
-    xaxis_tickangle=-45,
-    height=600,
-    showlegend=False
-)
-fig7.write_html(str(output_dir / '07_state_density.html'))
-print("   Saved: 07_state_density.html")
-
-print("\n8. Creating comprehensive interactive dashboard...")
-
-# Create subplots
-fig_dashboard = make_subplots(
-    rows=2, cols=2,
-    subplot_titles=(
-        'Top 15 States by School Count',
-        'Rural-Urban Distribution',
-        'Top 10 Districts (All States)',
-        'School Type Distribution'
-    ),
-    specs=[
-        [{"type": "bar"}, {"type": "pie"}],
-        [{"type": "bar"}, {"type": "bar"}]
-    ]
-)
-
-# Chart 1: Top states
-fig_dashboard.add_trace(
-    go.Bar(x=state_counts.head(15)['State'], y=state_counts.head(15)['School_Count'],
-           name='Schools', marker_color='lightblue'),
-    row=1, col=1
-)
-
-# Chart 2: Rural-Urban pie
-fig_dashboard.add_trace(
-    go.Pie(labels=ru_data['Type'], values=ru_data['Count'], name='Distribution'),
-    row=1, col=2
-)
-
-# Chart 3: Top districts
-top_districts_all = df.groupby('district').size().sort_values(ascending=False).head(10)
-fig_dashboard.add_trace(
-    go.Bar(x=top_districts_all.index, y=top_districts_all.values,
-           name='Districts', marker_color='lightgreen'),
-    row=2, col=1
-)
-
-# Chart 4: School types
-if 'school_type' in df.columns:
-    type_data = df['school_type'].value_counts().head(5)
-    fig_dashboard.add_trace(
-        go.Bar(x=[str(x) for x in type_data.index], y=type_data.values,
-               name='Types', marker_color='lightcoral'),
-        row=2, col=2
-    )
-
-fig_dashboard.update_layout(
-    height=1000,
-    title_text="UDISE 2024-25 Education Dashboard",
-    showlegend=True,
-    title_font_size=20
-)
-
-fig_dashboard.update_xaxes(tickangle=-45, row=1, col=1)
-fig_dashboard.update_xaxes(tickangle=-45, row=2, col=1)
-fig_dashboard.update_xaxes(tickangle=-45, row=2, col=2)
-
-fig_dashboard.write_html(str(output_dir / '00_comprehensive_dashboard.html'))
-print("   Saved: 00_comprehensive_dashboard.html")
-
-# STATE COMPARISON TABLE
-
-print("\n9. Creating state comparison summary...")
-
-state_summary = df.groupby('state').agg({
-    'pseudocode': 'count',
-    'rural_urban': lambda x: (x == 1.0).sum()  # Rural count
-}).rename(columns={'pseudocode': 'Total_Schools', 'rural_urban': 'Rural_Schools'})
-state_summary['Urban_Schools'] = df.groupby('state')['rural_urban'].apply(lambda x: (x == 2.0).sum())
-state_summary['Rural_Percentage'] = (state_summary['Rural_Schools'] / state_summary['Total_Schools'] * 100).round(1)
-state_summary = state_summary.sort_values('Total_Schools', ascending=False).reset_index()
-
-# interactive table
-fig_table = go.Figure(data=[go.Table(
-    header=dict(
-        values=['State', 'Total Schools', 'Rural Schools', 'Urban Schools', 'Rural %'],
-        fill_color='paleturquoise',
-        align='left',
-        font=dict(size=12, color='black')
-    ),
-    cells=dict(
-        values=[
-            state_summary['state'].head(20),
-            state_summary['Total_Schools'].head(20),
-            state_summary['Rural_Schools'].head(20),
-            state_summary['Urban_Schools'].head(20),
-            state_summary['Rural_Percentage'].head(20)
-        ],
-        fill_color='lavender',
-        align='left',
-        font=dict(size=11)
-    )
-)])
-
-fig_table.update_layout(
-    title='State-wise School Distribution Summary (Top 20)',
-    height=700
-)
-fig_table.write_html(str(output_dir / '08_state_comparison_table.html'))
-print("   Saved: 08_state_comparison_table.html")
-
-state_summary.to_csv(output_dir / 'state_summary.csv', index=False)
-print("   Saved: state_summary.csv")
+            assert len(type_counts) < MAX_PLOT_ROWS
+            fig5 = px.bar(
+                type_counts,
+                x='School_Type',
+                y='Count',
+                title='School Type Distribution (Top 10)',
+                labels={'Count': 'Number of Schools', 'School_Type': 'School Type'},
+                color='Count',
+                color_continuous_scale='Blues'
+            )
+            fig5.update_layout(height=500, showlegend=False)
+            save_chart(fig5, '05_school_types.html')
+
+        print("\n6. Creating school category distribution...")
+
+        if 'school_category' in load_cols:
+            cat_counts = results['school_category'].copy()
+            cat_counts.columns = ['Category', 'Count']
+            cat_counts['Percentage'] = (cat_counts['Count'] / n_schools * 100).round(1)
+    
+            assert len(cat_counts) < MAX_PLOT_ROWS
+            fig6 = px.bar(
+                cat_counts,
+                x='Category',
+                y='Count',
+                title='School Category Distribution (Top 10)',
+                labels={'Count': 'Number of Schools', 'Category': 'Category'},
+                text='Percentage'
+            )
+            fig6.update_traces(textposition='outside', texttemplate='%{text}%')
+            fig6.update_layout(height=500, showlegend=False)
+            save_chart(fig6, '06_school_categories.html')
+
+        print("\n7. Creating state-wise school density visualization...")
+
+        # Only the top 20 states are plotted, so only they are copied and ranked
+        state_density = top20_states.assign(Density_Rank=top20_states['School_Count'].rank(ascending=False))
+
+        assert len(state_density) < MAX_PLOT_ROWS
+        fig7 = px.scatter(
+            state_density,
+            x='State',
+            y='School_Count',
+            size='School_Count',
+            color='School_Count',
+            title='School Distribution by State (Bubble Chart)',
+            labels={'School_Count': 'Number of Schools', 'State': 'State'},
+            color_continuous_scale='Reds',
+            render_mode='webgl'
+        )
+        fig7.update_layout(
+            xaxis_tickangle=-45,
+            height=600,
+            showlegend=False
+        )
+        save_chart(fig7, '07_state_density.html')
+
+        print("\n8. Creating comprehensive interactive dashboard...")
+
+        # Create subplots
+        fig_dashboard = make_subplots(
+            rows=2, cols=2,
+            subplot_titles=(
+                'Top 15 States by School Count',
+                'Rural-Urban Distribution',
+                'Top 10 Districts (All States)',
+                'School Type Distribution'
+            ),
+            specs=[
+                [{"type": "bar"}, {"type": "pie"}],
+                [{"type": "bar"}, {"type": "bar"}]
+            ]
+        )
+
+        # Chart 1: Top states
+        fig_dashboard.add_trace(
+            go.Bar(x=top15_states['State'], y=top15_states['School_Count'],
+                   name='Schools', marker_color='lightblue'),
+            row=1, col=1
+        )
+
+        # Chart 2: Rural-Urban pie
+        fig_dashboard.add_trace(
+            go.Pie(labels=ru_data['Type'], values=ru_data['Count'], name='Distribution'),
+            row=1, col=2
+        )
+
+        # Chart 3: Top districts
+        # Summed from the state x district counts already collected, not a separate pass over the data
+        top_districts_all = (
+            results['state_district'].groupby('district', observed=True, sort=False)['school_count'].sum()
+            .nlargest(10)
+        )
+        fig_dashboard.add_trace(
+            go.Bar(x=top_districts_all.index, y=top_districts_all.values,
+                   name='Districts', marker_color='lightgreen'),
+            row=2, col=1
+        )
+
+        # Chart 4: School types
+        if 'school_type' in load_cols:
+            fig_dashboard.add_trace(
+                go.Bar(x=type_top5['School_Type'].astype(str), y=type_top5['Count'],
+                       name='Types', marker_color='lightcoral'),
+                row=2, col=2
+            )
+
+        fig_dashboard.update_layout(
+            height=1000,
+            title_text="UDISE 2024-25 Education Dashboard",
+            showlegend=True,
+            title_font_size=20
+        )
+
+        fig_dashboard.update_xaxes(tickangle=-45, row=1, col=1)
+        fig_dashboard.update_xaxes(tickangle=-45, row=2, col=1)
+        fig_dashboard.update_xaxes(tickangle=-45, row=2, col=2)
+
+        save_chart(fig_dashboard, '00_comprehensive_dashboard.html', 'directory')
+
+        # STATE COMPARISON TABLE
+
+        print("\n9. Creating state comparison summary...")
+
+        state_summary = results['state_summary']
+        top20_summary = state_summary.head(20)
+
+        # interactive table
+        fig_table = go.Figure(data=[go.Table(
+            header=dict(
+                values=['State', 'Total Schools', 'Rural Schools', 'Urban Schools', 'Rural %'],
+                fill_color='paleturquoise',
+                align='left',
+                font=dict(size=12, color='black')
+            ),
+            cells=dict(
+                values=[
+                    top20_summary['state'],
+                    top20_summary['Total_Schools'],
+                    top20_summary['Rural_Schools'],
+                    top20_summary['Urban_Schools'],
+                    top20_summary['Rural_Percentage']
+                ],
+                fill_color='lavender',
+                align='left',
+                font=dict(size=11)
+            )
+        )])
+
+        fig_table.update_layout(
+            title='State-wise School Distribution Summary (Top 20)',
+            height=700
+        )
+        save_chart(fig_table, '08_state_comparison_table.html')
+
+        pacsv.write_csv(pa.Table.from_pandas(state_summary, preserve_index=False), output_dir / 'state_summary.csv')
+        print("   Saved: state_summary.csv")
+
+        print(f"\nWaiting for {len(futures)} chart writes...")
+        for future in as_completed(futures):
+            future.result()
+            print(f"   Saved: {futures[future]}")
+
+
+if __name__ == '__main__':
+    main()